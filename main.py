@@ -7,25 +7,55 @@
 
 import os
 import sys
+import time
+import asyncio
+import importlib.util
 import logging
-import traceback
+import requests
+from dataclasses import dataclass, field
 from datetime import datetime
-from crawler import TaiwanCalendarCrawler
-from converter import CalendarConverter
+from typing import List, Optional
 
-# 設定日誌格式
+# 設定日誌格式（可用環境變數LOG_LEVEL=DEBUG顯示逐檔案的處理紀錄）
+# getLevelName對已知的層級名稱返回數值，其他名稱返回字串，此時改用INFO
+_log_level_name = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+_log_level = logging.getLevelName(_log_level_name)
 logging.basicConfig(
-    level=logging.INFO,
+    level=_log_level if isinstance(_log_level, int) else logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
     handlers=[
         logging.StreamHandler(sys.stdout)
     ]
 )
 logger = logging.getLogger(__name__)
+if not isinstance(_log_level, int):
+    logger.warning("無效的LOG_LEVEL設定: %s，改用INFO", _log_level_name)
+
+@dataclass(slots=True)
+class RunStats:
+    """執行統計資料"""
+    
+    execution_start_time: Optional[datetime] = None
+    start_counter: Optional[float] = None
+    execution_time: float = 0.0
+    crawl_success_count: int = 0
+    crawl_total_count: int = 0
+    convert_success_count: int = 0
+    convert_total_count: int = 0
+    conversion_skipped: bool = False
+    updated_csv_files: List[str] = field(default_factory=list)
+    converted_json_files: List[str] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
 
 class TaiwanCalendarSystem:
     """台灣行政機關辦公日曆系統主類別"""
     
+    __slots__ = ('origin_dir', 'docs_dir', 'force_update', 'http', 'crawler', 'converter', 'stats')
+    
+    # 日誌區塊的分隔線
+    _SEPARATOR = "=" * 60
+    
     def __init__(self, origin_dir='origin', docs_dir='docs'):
         """
         初始化系統
@@ -36,19 +66,22 @@ class TaiwanCalendarSystem:
         """
         self.origin_dir = origin_dir
         self.docs_dir = docs_dir
-        self.crawler = TaiwanCalendarCrawler(origin_dir=origin_dir)
+        
+        # 設定環境變數FORCE_UPDATE=true時，不論CSV是否變更都重新轉換所有檔案
+        self.force_update = os.environ.get('FORCE_UPDATE', 'false').lower() == 'true'
+        
+        # 爬蟲與轉換模組延遲到建立系統實例時才匯入，僅匯入main模組時不需載入
+        from crawler import TaiwanCalendarCrawler, create_session
+        from converter import CalendarConverter
+        
+        # 共用的HTTP工作階段，讓連線檢查與爬蟲重複使用同一個連線池與重試設定
+        self.http = create_session()
+        
+        self.crawler = TaiwanCalendarCrawler(origin_dir=origin_dir, session=self.http)
         self.converter = CalendarConverter(origin_dir=origin_dir, docs_dir=docs_dir)
         
         # 執行統計
-        self.stats = {
-            'execution_start_time': None,
-            'execution_end_time': None,
-            'crawl_success_count': 0,
-            'crawl_total_count': 0,
-            'convert_success_count': 0,
-            'convert_total_count': 0,
-            'errors': []
-        }
+        self.stats = RunStats()
     
     def check_environment(self) -> bool:
         """
@@ -60,19 +93,19 @@ class TaiwanCalendarSystem:
         try:
             logger.info("正在檢查執行環境...")
             
+            # 檔案編碼約定：原始CSV為帶BOM的UTF-8（以utf-8-sig讀取）或BIG5（無BOM，由轉換器偵測），
+            # 輸出的JSON與.etags.json一律為UTF-8，所有文字檔的open()都明確指定編碼
+            
             # 檢查必要的套件
             required_packages = {
                 'requests': 'requests',
-                'beautifulsoup4': 'bs4',
-                'pandas': 'pandas', 
                 'lxml': 'lxml'
             }
             missing_packages = []
             
+            # 只檢查套件是否可匯入，不實際執行套件的初始化
             for package_name, import_name in required_packages.items():
-                try:
-                    __import__(import_name)
-                except ImportError:
+                if importlib.util.find_spec(import_name) is None:
                     missing_packages.append(package_name)
             
             if missing_packages:
@@ -88,13 +121,13 @@ class TaiwanCalendarSystem:
                 logger.error("沒有足夠權限創建目錄")
                 return False
             
-            # 檢查網路連線
+            # 檢查網路連線（以HEAD請求探測實際的資料來源網站，不下載內容）
+            # 共用工作階段不重試HEAD請求，探測最多只等待2秒
             try:
-                import requests
-                response = requests.get('https://www.google.com', timeout=10)
-                if response.status_code != 200:
+                response = self.http.head(self.crawler.target_url, timeout=2, allow_redirects=False)
+                if not 200 <= response.status_code < 400:
                     logger.warning("網路連線可能不穩定")
-            except Exception as e:
+            except requests.exceptions.RequestException as e:
                 logger.warning(f"網路連線檢查失敗: {e}")
             
             logger.info("執行環境檢查通過")
@@ -102,7 +135,7 @@ class TaiwanCalendarSystem:
             
         except Exception as e:
             logger.error(f"環境檢查時發生錯誤: {e}")
-            self.stats['errors'].append(f"環境檢查錯誤: {e}")
+            self.stats.errors.append(f"環境檢查錯誤: {e}")
             return False
     
     def execute_crawling(self) -> bool:
@@ -113,62 +146,67 @@ class TaiwanCalendarSystem:
             bool: 爬蟲執行成功返回True，否則返回False
         """
         try:
-            logger.info("=" * 60)
-            logger.info("開始執行爬蟲階段")
-            logger.info("=" * 60)
+            self._log_banner("開始執行爬蟲階段")
             
-            # 執行爬蟲
-            success_count, total_count = self.crawler.crawl()
+            # 執行爬蟲（以asyncio並行下載）
+            # 驗證資訊待轉換完成後才儲存，見run()
+            success_count, total_count, _ = asyncio.run(self.crawler.crawl_async(persist_etags=False))
             
             # 更新統計資訊
-            self.stats['crawl_success_count'] = success_count
-            self.stats['crawl_total_count'] = total_count
+            self.stats.crawl_success_count = success_count
+            self.stats.crawl_total_count = total_count
+            self.stats.updated_csv_files = list(self.crawler.updated_files)
             
             if success_count > 0:
                 logger.info(f"爬蟲階段完成: 成功下載 {success_count}/{total_count} 個檔案")
                 return True
             else:
                 logger.error("爬蟲階段失敗: 沒有成功下載任何檔案")
-                self.stats['errors'].append("爬蟲階段：沒有成功下載任何檔案")
+                self.stats.errors.append("爬蟲階段：沒有成功下載任何檔案")
                 return False
                 
         except Exception as e:
-            logger.error(f"爬蟲階段發生錯誤: {e}")
-            logger.error(f"錯誤詳情: {traceback.format_exc()}")
-            self.stats['errors'].append(f"爬蟲階段錯誤: {e}")
+            logger.exception("爬蟲階段發生錯誤: %s", e)
+            self.stats.errors.append(f"爬蟲階段錯誤: {e}")
             return False
     
-    def execute_conversion(self) -> bool:
+    def execute_conversion(self, changed_files=None) -> bool:
         """
         執行轉換階段
         
+        Args:
+            changed_files (list): 爬蟲階段實際更新的CSV檔案路徑列表，None表示全部轉換
+            
         Returns:
             bool: 轉換執行成功返回True，否則返回False
         """
         try:
-            logger.info("=" * 60)
-            logger.info("開始執行轉換階段")
-            logger.info("=" * 60)
+            self._log_banner("開始執行轉換階段")
             
             # 執行轉換
-            success_count, total_count = self.converter.convert_all()
+            success_count, total_count, json_files = self.converter.convert_all(changed_files)
+            
+            if changed_files is not None and total_count == 0:
+                logger.info("轉換階段完成: 資料未變更，略過轉換")
+                self.stats.conversion_skipped = True
+                return True
             
             # 更新統計資訊
-            self.stats['convert_success_count'] = success_count
-            self.stats['convert_total_count'] = total_count
+            self.stats.convert_success_count = success_count
+            self.stats.convert_total_count = total_count
+            self.stats.converted_json_files = json_files
             
             if success_count > 0:
                 logger.info(f"轉換階段完成: 成功轉換 {success_count}/{total_count} 個檔案")
                 return True
             else:
                 logger.error("轉換階段失敗: 沒有成功轉換任何檔案")
-                self.stats['errors'].append("轉換階段：沒有成功轉換任何檔案")
+                self.stats.errors.append("轉換階段：沒有成功轉換任何檔案")
                 return False
                 
         except Exception as e:
-            logger.error(f"轉換階段發生錯誤: {e}")
-            logger.error(f"錯誤詳情: {traceback.format_exc()}")
-            self.stats['errors'].append(f"轉換階段錯誤: {e}")
+            logger.exception("轉換階段發生錯誤: %s", e)
+            self.stats.errors.append(f"轉換階段錯誤: {e}")
             return False
     
     def generate_summary(self) -> dict:
@@ -178,40 +216,46 @@ class TaiwanCalendarSystem:
         Returns:
             dict: 包含執行結果統計的字典
         """
-        execution_time = 0
-        if self.stats['execution_start_time'] and self.stats['execution_end_time']:
-            execution_time = (self.stats['execution_end_time'] - self.stats['execution_start_time']).total_seconds()
+        stats = self.stats
+        crawl_success, crawl_total = stats.crawl_success_count, stats.crawl_total_count
+        convert_success, convert_total = stats.convert_success_count, stats.convert_total_count
+        errors = stats.errors
         
-        # 獲取檔案統計
+        # 獲取檔案統計：總數一律以目錄中實際存在的檔案為準，本次更新的檔案另外列出
         csv_files = []
         json_files = []
         
         if os.path.exists(self.origin_dir):
-            csv_files = [f for f in os.listdir(self.origin_dir) if f.lower().endswith('.csv')]
+            with os.scandir(self.origin_dir) as entries:
+                csv_files = [entry.name for entry in entries if entry.is_file() and entry.name.endswith('.csv')]
         
         if os.path.exists(self.docs_dir):
-            json_files = [f for f in os.listdir(self.docs_dir) if f.lower().endswith('.json')]
+            with os.scandir(self.docs_dir) as entries:
+                json_files = [entry.name for entry in entries if entry.is_file() and entry.name.endswith('.json')]
         
         summary = {
-            'execution_time': round(execution_time, 2),
+            'execution_time': round(stats.execution_time, 2),
             'crawl_results': {
-                'success': self.stats['crawl_success_count'],
-                'total': self.stats['crawl_total_count'],
-                'success_rate': round(self.stats['crawl_success_count'] / max(self.stats['crawl_total_count'], 1) * 100, 2)
+                'success': crawl_success,
+                'total': crawl_total,
+                'success_rate': round(crawl_success * 100 / crawl_total, 2) if crawl_total else 0.0
             },
             'conversion_results': {
-                'success': self.stats['convert_success_count'],
-                'total': self.stats['convert_total_count'],
-                'success_rate': round(self.stats['convert_success_count'] / max(self.stats['convert_total_count'], 1) * 100, 2)
+                'success': convert_success,
+                'total': convert_total,
+                'success_rate': round(convert_success * 100 / convert_total, 2) if convert_total else 0.0,
+                'skipped': stats.conversion_skipped
             },
             'file_statistics': {
                 'csv_files': len(csv_files),
                 'json_files': len(json_files),
                 'csv_file_list': csv_files,
-                'json_file_list': json_files
+                'json_file_list': json_files,
+                'updated_csv_files': [os.path.basename(f) for f in stats.updated_csv_files],
+                'converted_json_files': [os.path.basename(f) for f in stats.converted_json_files]
             },
-            'errors': self.stats['errors'],
-            'overall_success': len(self.stats['errors']) == 0 and self.stats['crawl_success_count'] > 0 and self.stats['convert_success_count'] > 0
+            'errors': errors,
+            'overall_success': not errors and crawl_success > 0 and (convert_success > 0 or stats.conversion_skipped)
         }
         
         return summary
@@ -223,38 +267,48 @@ class TaiwanCalendarSystem:
         Args:
             summary (dict): 執行摘要字典
         """
-        logger.info("=" * 60)
-        logger.info("執行摘要報告")
-        logger.info("=" * 60)
-        
-        # 執行時間
-        logger.info(f"總執行時間: {summary['execution_time']} 秒")
-        
-        # 爬蟲結果
         crawl = summary['crawl_results']
-        logger.info(f"爬蟲結果: {crawl['success']}/{crawl['total']} 個檔案 (成功率: {crawl['success_rate']}%)")
-        
-        # 轉換結果
         convert = summary['conversion_results']
-        logger.info(f"轉換結果: {convert['success']}/{convert['total']} 個檔案 (成功率: {convert['success_rate']}%)")
-        
-        # 檔案統計
         files = summary['file_statistics']
-        logger.info(f"檔案統計: {files['csv_files']} 個CSV檔案, {files['json_files']} 個JSON檔案")
+        errors = summary['errors']
+        
+        # 整份摘要組成一段文字後一次寫入日誌
+        lines = [
+            self._SEPARATOR,
+            "執行摘要報告",
+            self._SEPARATOR,
+            f"總執行時間: {summary['execution_time']} 秒",
+            f"爬蟲結果: {crawl['success']}/{crawl['total']} 個檔案 (成功率: {crawl['success_rate']}%)",
+            (f"轉換結果: {convert['success']}/{convert['total']} 個檔案 (成功率: {convert['success_rate']}%)"
+             if not convert['skipped'] else "轉換結果: 資料未變更，略過轉換"),
+            f"檔案統計: {files['csv_files']} 個CSV檔案, {files['json_files']} 個JSON檔案",
+            f"本次更新: {len(files['updated_csv_files'])} 個CSV檔案, {len(files['converted_json_files'])} 個JSON檔案",
+        ]
         
         # 錯誤資訊
-        if summary['errors']:
-            logger.error(f"發生 {len(summary['errors'])} 個錯誤:")
-            for i, error in enumerate(summary['errors'], 1):
-                logger.error(f"  {i}. {error}")
+        if errors:
+            lines.append(f"發生 {len(errors)} 個錯誤:")
+            lines.extend(f"  {i}. {error}" for i, error in enumerate(errors, 1))
         
-        # 整體結果
+        # 整體結果：失敗時整份摘要以ERROR層級輸出
         if summary['overall_success']:
-            logger.info("整體執行狀態: 成功 ✓")
+            lines.append("整體執行狀態: 成功 ✓")
+            level = logging.INFO
         else:
-            logger.error("整體執行狀態: 失敗 ✗")
+            lines.append("整體執行狀態: 失敗 ✗")
+            level = logging.ERROR
         
-        logger.info("=" * 60)
+        lines.append(self._SEPARATOR)
+        logger.log(level, "\n".join(lines))
+    
+    def _log_banner(self, title: str):
+        """
+        將標題與上下分隔線一次寫入日誌
+        
+        Args:
+            title (str): 標題文字
+        """
+        logger.info("\n".join((self._SEPARATOR, title, self._SEPARATOR)))
     
     def run(self) -> bool:
         """
@@ -263,11 +317,13 @@ class TaiwanCalendarSystem:
         Returns:
             bool: 整體執行成功返回True，否則返回False
         """
+        # 啟動時間僅用於顯示，執行時間以單調遞增的perf_counter計算
+        self.stats.execution_start_time = datetime.now()
+        self.stats.start_counter = time.perf_counter()
+        
         try:
-            self.stats['execution_start_time'] = datetime.now()
-            
             logger.info("台灣行政機關辦公日曆爬蟲系統啟動")
-            logger.info(f"執行時間: {self.stats['execution_start_time'].strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.info(f"執行時間: {self.stats.execution_start_time.strftime('%Y-%m-%d %H:%M:%S')}")
             
             # 1. 環境檢查
             if not self.check_environment():
@@ -277,33 +333,38 @@ class TaiwanCalendarSystem:
             crawl_success = self.execute_crawling()
             
             # 3. 執行轉換（即使爬蟲部分失敗，也嘗試轉換現有檔案）
-            convert_success = self.execute_conversion()
+            #    爬蟲成功時只轉換有更新的年度，爬蟲失敗或強制更新時全部轉換
+            changed_files = None
+            if crawl_success and not self.force_update:
+                changed_files = self.crawler.updated_files
+            convert_success = self.execute_conversion(changed_files)
+            
+            # 4. 儲存下載驗證資訊：轉換失敗的年度不保留驗證資訊，下次執行時會重新下載並轉換，
+            #    避免伺服器回傳304而讓舊的JSON檔案一直留著
+            failed_files = list(self.converter.failed_files)
+            if not convert_success:
+                failed_files.extend(self.crawler.updated_files)
+            self.crawler.forget_validators(failed_files)
+            self.crawler.save_etags()
             
             # 記錄執行結果到日誌
             logger.info(f"爬蟲執行狀態: {'成功' if crawl_success else '失敗'}")
             logger.info(f"轉換執行狀態: {'成功' if convert_success else '失敗'}")
             
-            # 4. 記錄結束時間
-            self.stats['execution_end_time'] = datetime.now()
-            
-            # 5. 生成並顯示摘要
-            summary = self.generate_summary()
-            self.print_summary(summary)
-            
-            # 返回整體執行結果
-            return summary['overall_success']
-            
         except Exception as e:
-            logger.error(f"系統執行時發生未預期的錯誤: {e}")
-            logger.error(f"錯誤詳情: {traceback.format_exc()}")
-            
-            self.stats['execution_end_time'] = datetime.now()
-            self.stats['errors'].append(f"系統錯誤: {e}")
+            logger.exception("系統執行時發生未預期的錯誤: %s", e)
+            self.stats.errors.append(f"系統錯誤: {e}")
             
-            summary = self.generate_summary()
-            self.print_summary(summary)
-            
-            return False
+        finally:
+            self.http.close()
+        
+        # 5. 記錄執行時間，並生成及顯示摘要（正常結束或發生例外時都只執行一次）
+        self.stats.execution_time = time.perf_counter() - self.stats.start_counter
+        summary = self.generate_summary()
+        self.print_summary(summary)
+        
+        # 返回整體執行結果
+        return summary['overall_success']
 
 
 def main():
@@ -321,8 +382,7 @@ def main():
         logger.info("用戶中斷執行")
         sys.exit(1)
     except Exception as e:
-        logger.error(f"程式執行時發生致命錯誤: {e}")
-        logger.error(f"錯誤詳情: {traceback.format_exc()}")
+        logger.exception("程式執行時發生致命錯誤: %s", e)
         sys.exit(1)
 
 